@@ -44,7 +44,12 @@ const CONFIG = {
   pyodideUrl: 'https://cdn.jsdelivr.net/pyodide/v0.27.0/full/',
   
   // Python packages to install (from PyPI)
-  pythonPackages: ['pydantic', 'pyyaml', 'typing-extensions'],
+  pythonPackages: ['pydantic', 'pyyaml', 'typing-extensions', 'orjson'],
+  
+  // Minimum interval between streamed chunk callbacks. Tokens arriving in
+  // between are coalesced, so the callback (and any Python/JS boundary it
+  // crosses) runs once per batch rather than once per token.
+  streamFlushMs: 50,
   
   // Local wheel for amplifier-core (served from /wheels/)
   amplifierCoreWheel: '/wheels/amplifier_core-1.0.0-py3-none-any.whl',
@@ -248,7 +253,15 @@ async function initAmplifierSession() {
   await pyodide.runPythonAsync(pythonCode);
   
   // Set up the bridge between Python and JavaScript
-  // This allows Python to call the LLM
+  // This allows Python to call the LLM. Both functions resolve to
+  // { content, usage: { input_tokens, output_tokens, total_tokens }, finish_reason }
+  // so Python can build amplifier-core's Usage directly from result.usage.
+  const toUsage = (usage) => ({
+    input_tokens: usage?.prompt_tokens ?? 0,
+    output_tokens: usage?.completion_tokens ?? 0,
+    total_tokens: usage?.total_tokens ?? 0,
+  });
+  
   pyodide.globals.set('js_llm_complete', async (messagesJson) => {
     const messages = JSON.parse(messagesJson);
     
@@ -258,10 +271,12 @@ async function initAmplifierSession() {
       max_tokens: 2048,
     });
     
-    return JSON.stringify({
+    // Plain object - Python converts it with .to_py(), no JSON round-trip
+    return {
       content: response.choices[0].message.content,
-      usage: response.usage,
-    });
+      usage: toUsage(response.usage),
+      finish_reason: response.choices[0].finish_reason || 'stop',
+    };
   });
   
   // Streaming version
@@ -277,14 +292,24 @@ async function initAmplifierSession() {
     
     let fullContent = '';
     let usage = null;
+    let finishReason = 'stop';
+    let pending = '';
+    let lastFlush = performance.now();
     
     for await (const chunk of stream) {
       const delta = chunk.choices[0]?.delta?.content || '';
       fullContent += delta;
+      pending += delta;
+      
+      // Hand batched deltas to the callback rather than one call per token
+      if (pending && performance.now() - lastFlush >= CONFIG.streamFlushMs) {
+        onChunk(pending);
+        pending = '';
+        lastFlush = performance.now();
+      }
       
-      if (delta) {
-        // Call Python callback with the chunk
-        onChunk(delta);
+      if (chunk.choices[0]?.finish_reason) {
+        finishReason = chunk.choices[0].finish_reason;
       }
       
       if (chunk.usage) {
@@ -292,10 +317,15 @@ async function initAmplifierSession() {
       }
     }
     
-    return JSON.stringify({
+    if (pending) {
+      onChunk(pending);
+    }
+    
+    return {
       content: fullContent,
-      usage: usage || { prompt_tokens: 0, completion_tokens: 0, total_tokens: 0 },
-    });
+      usage: toUsage(usage),
+      finish_reason: finishReason,
+    };
   });
   
   // Initialize the session in Python (using amplifier-core browser shim)
@@ -359,39 +389,31 @@ async function sendMessage(userMessage) {
     };
     
     // Execute through Python session with streaming
-    const resultJson = await pyodide.runPythonAsync(`
-import json
-from pyodide.ffi import create_proxy
+    const result = await pyodide.runPythonAsync(`
 from js import window
 
 async def run_completion():
-    messages_json = json.dumps([
-        {"role": "system", "content": session.system_prompt},
-        *[{"role": m["role"], "content": m["content"]} for m in session.history],
-        {"role": "user", "content": ${JSON.stringify(userMessage)}}
-    ])
+    # The session's context manager owns the history (and its cached JSON)
+    session.context.add_message_sync(
+        Message(role=ROLE_USER, content=${JSON.stringify(userMessage)})
+    )
+    messages_json = session.context.get_messages_json_for_request()
     
-    # Add to history
-    session.history.append({"role": "user", "content": ${JSON.stringify(userMessage)}})
-    
-    # Create proxy for streaming callback
-    stream_callback = create_proxy(window._streamCallback)
-    
-    # Call JavaScript LLM with streaming
-    result_json = await js_llm_stream(messages_json, stream_callback)
-    result = json.loads(result_json)
+    # Pass the JS callback straight through - it unwraps back to the JS
+    # function, so streamed chunks never cross into Python
+    result = await js_llm_stream(messages_json, window._streamCallback)
     
     # Add response to history
-    session.history.append({"role": "assistant", "content": result["content"]})
+    session.context.add_message_sync(
+        Message(role=ROLE_ASSISTANT, content=result.content)
+    )
     
-    return result_json
+    # Returning the JsProxy hands the original JS object back to JS
+    return result
 
 await run_completion()
     `);
     
-    // Parse result
-    const result = JSON.parse(resultJson);
-    
     // If streaming didn't populate (fallback), use final result
     if (!fullResponse && result.content) {
       typingEl.remove();
@@ -403,8 +425,8 @@ await run_completion()
     // Calculate stats
     const endTime = performance.now();
     const duration = (endTime - startTime) / 1000;
-    const tokensPerSec = result.usage?.completion_tokens 
-      ? (result.usage.completion_tokens / duration).toFixed(1)
+    const tokensPerSec = result.usage?.output_tokens 
+      ? (result.usage.output_tokens / duration).toFixed(1)
       : '--';
     
     elements.statSpeed.textContent = `${tokensPerSec} tok/s`;
@@ -8,9 +8,25 @@ amplifier-core's type system, hooks, and coordinator infrastructure.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from typing import Any, Callable, AsyncIterator, TYPE_CHECKING
+from collections import deque
+from typing import Any, Callable, AsyncIterator, Final, TYPE_CHECKING
+
+try:
+    # Compiled encoder shipped with Pyodide; much cheaper than stdlib json in WASM
+    import orjson  # type: ignore[import-not-found]
+except ImportError:  # Fall back to stdlib json
+    orjson = None
+
+try:
+    from pyodide.ffi import create_proxy  # type: ignore[import-not-found]
+except ImportError:  # Outside Pyodide there is no JS side to proxy for
+
+    def create_proxy(obj: Any) -> Any:
+        return obj
+
 
 # amplifier-core imports - these resolve at runtime in Pyodide after micropip install
 # pyright: reportMissingImports=false
@@ -28,23 +44,80 @@ from amplifier_core.models import ProviderInfo, ModelInfo  # type: ignore[import
 from amplifier_core.hooks import HookRegistry  # type: ignore[import-not-found]
 from amplifier_core import events  # type: ignore[import-not-found]
 
-# Role constants (amplifier-core uses Literal strings, not enums)
-ROLE_SYSTEM = "system"
-ROLE_USER = "user"
-ROLE_ASSISTANT = "assistant"
+# Role constants (amplifier-core uses Literal strings, not enums). Final keeps
+# them typed as the literals Message.role accepts, so no conversion is needed.
+ROLE_SYSTEM: Final = "system"
+ROLE_USER: Final = "user"
+ROLE_ASSISTANT: Final = "assistant"
+ROLE_TOOL: Final = "tool"
+
+# Replaces the content of a tool result that is repeated later in context
+ELIDED_CONTENT = "[elided duplicate]"
 
 # JS bridge functions injected by main.js
+# Both return a plain JS object rather than a JSON string, shaped as
+# {content, usage: {input_tokens, output_tokens, total_tokens}, finish_reason}
 if TYPE_CHECKING:
+    from pyodide.ffi import JsProxy  # type: ignore[import-not-found]
 
-    async def js_llm_complete(messages_json: str) -> str: ...
+    async def js_llm_complete(messages_json: str) -> JsProxy: ...
     async def js_llm_stream(
         messages_json: str, on_chunk: Callable[[str], None]
-    ) -> str: ...
+    ) -> JsProxy: ...
 
 
 logger = logging.getLogger(__name__)
 
 
+# Shared stdlib encoder for when orjson is missing. Compact, non-ASCII-escaping
+# output matches orjson and keeps the strings sent across the bridge small.
+_json_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _json_dumps(data: Any) -> str:
+    """Serialize data for the JS bridge, preferring orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return _json_encode(data)
+
+
+def _blocks_text(blocks: list[Any]) -> str:
+    """Concatenate the text of a list of content blocks."""
+    text = ""
+    for block in blocks:
+        if hasattr(block, "text"):
+            text += block.text
+        elif isinstance(block, str):
+            text += block
+    return text
+
+
+def _message_to_dict(message: Message) -> dict[str, str]:
+    """
+    Convert a Message to the plain dict shape expected by the JS bridge.
+
+    Block-list content is flattened to its text, so ``content`` is always
+    a string (JSON-serializable, hashable and measurable).
+    """
+    content = message.content
+    if not isinstance(content, str):
+        content = _blocks_text(content or [])
+    msg_dict = {"role": message.role, "content": content}
+    if message.name:
+        msg_dict["name"] = message.name
+    return msg_dict
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), cheap enough per message."""
+    return len(text) >> 2
+
+
+def _response_text(response: ChatResponse) -> str:
+    """Concatenate the text blocks of a ChatResponse."""
+    return _blocks_text(response.content or [])
+
+
 # =============================================================================
 # WebGPU Provider - Bridges to JavaScript WebLLM
 # =============================================================================
@@ -90,45 +163,89 @@ class WebGPUProvider(Provider):
     async def complete(
         self,
         request: ChatRequest,
+        messages_json: str | None = None,
         **kwargs: Any,
     ) -> ChatResponse:
-        """Generate a completion using WebGPU."""
-        # Convert messages to format expected by JS bridge
-        messages_data = []
-        for msg in request.messages:
-            msg_dict = {"role": msg.role.value, "content": msg.content or ""}
-            if msg.name:
-                msg_dict["name"] = msg.name
-            messages_data.append(msg_dict)
-
-        messages_json = json.dumps(messages_data)
-
-        # Call JavaScript LLM function
-        result_json = await js_llm_complete(messages_json)
-        result = json.loads(result_json)
-
-        # ChatResponse.content is a list of ContentBlocks
-        content_text = result.get("content", "")
+        """
+        Generate a completion using WebGPU.
+
+        Callers that already hold the bridge JSON for ``request.messages``
+        (e.g. from SimpleContextManager) can pass it as ``messages_json``
+        to skip re-serializing the whole history every turn.
+        """
+        if messages_json is None:
+            # Convert messages to format expected by JS bridge
+            messages_json = _json_dumps(
+                [_message_to_dict(msg) for msg in request.messages]
+            )
+
+        # Call JavaScript LLM function - the result arrives as a JS object,
+        # so convert it directly instead of a JSON.stringify/json.loads pair
+        result = (await js_llm_complete(messages_json)).to_py()
+
+        # ChatResponse.content is a list of ContentBlocks; the bridge already
+        # shapes usage to match amplifier-core's Usage fields
         return ChatResponse(
-            content=[TextBlock(text=content_text)],
-            usage=Usage(
-                prompt_tokens=result.get("usage", {}).get("prompt_tokens", 0),
-                completion_tokens=result.get("usage", {}).get("completion_tokens", 0),
-                total_tokens=result.get("usage", {}).get("total_tokens", 0),
-            ),
-            finish_reason="stop",
+            content=[TextBlock(text=result["content"] or "")],
+            usage=Usage(**result["usage"]),
+            finish_reason=result["finish_reason"],
         )
 
     async def stream(
         self,
         request: ChatRequest,
+        messages_json: str | None = None,
         **kwargs: Any,
     ) -> AsyncIterator[ChatResponse]:
-        """Generate a streaming completion using WebGPU."""
-        # For now, fall back to non-streaming
-        # TODO: Implement proper streaming with JS bridge
-        response = await self.complete(request, **kwargs)
-        yield response
+        """
+        Generate a streaming completion using WebGPU.
+
+        Yields one text-delta response per batch of chunks, then a final
+        response with no content carrying usage and finish_reason.
+
+        js_llm_stream already coalesces tokens before calling back into
+        Python, and the callback only buffers them; whatever has arrived by
+        the time the consumer resumes is yielded as a single response.
+        """
+        if messages_json is None:
+            messages_json = _json_dumps(
+                [_message_to_dict(msg) for msg in request.messages]
+            )
+
+        pending: list[str] = []
+        chunk_ready = asyncio.Event()
+
+        def on_chunk(text: str) -> None:
+            pending.append(text)
+            chunk_ready.set()
+
+        chunk_proxy = create_proxy(on_chunk)
+        llm_task = asyncio.ensure_future(js_llm_stream(messages_json, chunk_proxy))
+        if chunk_proxy is not on_chunk:
+            # Destroy the proxy once JS stops calling it, which also covers
+            # a consumer that abandons this generator without closing it
+            llm_task.add_done_callback(lambda _: chunk_proxy.destroy())
+
+        while pending or not llm_task.done():
+            if not pending:
+                chunk_ready.clear()
+                chunk_wait = asyncio.ensure_future(chunk_ready.wait())
+                await asyncio.wait(
+                    {llm_task, chunk_wait}, return_when=asyncio.FIRST_COMPLETED
+                )
+                chunk_wait.cancel()
+                continue
+
+            text = "".join(pending)
+            pending.clear()
+            yield ChatResponse(content=[TextBlock(text=text)])
+
+        result = llm_task.result().to_py()
+        yield ChatResponse(
+            content=[],
+            usage=Usage(**result["usage"]),
+            finish_reason=result["finish_reason"],
+        )
 
 
 # =============================================================================
@@ -140,28 +257,106 @@ class SimpleContextManager(ContextManager):
     """
     Simple in-memory context manager for browser use.
 
-    Stores messages in memory with basic truncation support.
+    Keeps what is sent within an estimated token budget rather than a
+    message count: the default system prompt plus the conversation. The
+    oldest conversation messages are dropped once it is exceeded (the
+    newest message is always kept). System messages added to history are
+    kept for get_messages() but never sent, so they do not count. A tool
+    result repeated later in the conversation has its earlier copy
+    replaced by ELIDED_CONTENT.
     """
 
-    def __init__(self, max_messages: int = 100):
-        self._messages: list[Message] = []
-        self._max_messages = max_messages
+    # WebLLM runs these models with a 4096-token context window and main.js
+    # reserves 2048 tokens for the reply. The budget includes the system
+    # prompt; the remaining 512-token gap absorbs error in the len // 4 estimate.
+    DEFAULT_MAX_TOKENS = 1536
+
+    def __init__(self, max_tokens: int = DEFAULT_MAX_TOKENS):
+        self._max_tokens = max_tokens
         self._system_prompt: str | None = None
+        # Default system prompt as (Message, bridge JSON), built in set_system_prompt
+        self._system_entry: tuple[Message, str] | None = None
+        self._system_tokens = 0
+        self._reset_history()
+
+    def _reset_history(self) -> None:
+        """Initialize empty history state (also used by clear)."""
+        self._system: list[Message] = []
+        self._conversation: deque[Message] = deque()
+        # Bridge dicts for _conversation, built once per message in add_message.
+        # Only get_history_dicts reads these; requests use _conversation_json.
+        self._conversation_dicts: deque[dict[str, str]] = deque()
+        # Serialized form of each dict, so requests only encode new messages
+        self._conversation_json: deque[str] = deque()
+        # Running estimate for the system prompt + _conversation (what is sent),
+        # kept in add_message/_trim/set_system_prompt
+        self._token_count = self._system_tokens
+        # Sequence number of _conversation[0]; entry i has sequence _first_seq + i
+        self._first_seq = 0
+        # Tool result content -> sequence number of its latest occurrence
+        self._tool_results: dict[str, int] = {}
 
     async def add_message(self, message: Message) -> None:
         """Add a message to context."""
-        self._messages.append(message)
+        self.add_message_sync(message)
+
+    def add_message_sync(self, message: Message) -> None:
+        """
+        Add a message to context without going through a coroutine.
 
-        # Trim if needed (keep system messages)
-        if len(self._messages) > self._max_messages:
-            system_msgs = [m for m in self._messages if m.role == ROLE_SYSTEM]
-            other_msgs = [m for m in self._messages if m.role != ROLE_SYSTEM]
-            keep_count = self._max_messages - len(system_msgs)
-            self._messages = system_msgs + other_msgs[-keep_count:]
+        Nothing here suspends, so in-shim callers use this directly and
+        skip an event-loop round-trip per message.
+        """
+        if message.role == ROLE_SYSTEM:
+            # Not sent with requests (the system prompt is), so not budgeted
+            self._system.append(message)
+            return
+
+        msg_dict = _message_to_dict(message)
+        # Budgeting and elision use the flattened text from msg_dict, never
+        # message.content, which may be a list of content blocks
+        content = msg_dict["content"]
+        self._token_count += _estimate_tokens(content)
+        if message.role == ROLE_TOOL:
+            self._elide_tool_result(content)
+        self._conversation.append(message)
+        self._conversation_dicts.append(msg_dict)
+        self._conversation_json.append(_json_dumps(msg_dict))
+
+        self._trim()
+
+    def _elide_tool_result(self, content: str) -> None:
+        """Record a new tool result (flattened text), eliding an earlier identical one."""
+        previous_seq = self._tool_results.get(content)
+        self._tool_results[content] = self._first_seq + len(self._conversation)
+        if previous_seq is None:
+            return
+
+        i = previous_seq - self._first_seq
+        elided_dict = {**self._conversation_dicts[i], "content": ELIDED_CONTENT}
+        self._conversation[i] = self._conversation[i].model_copy(
+            update={"content": ELIDED_CONTENT}
+        )
+        self._conversation_dicts[i] = elided_dict
+        self._conversation_json[i] = _json_dumps(elided_dict)
+        self._token_count -= _estimate_tokens(content) - _estimate_tokens(
+            ELIDED_CONTENT
+        )
+
+    def _trim(self) -> None:
+        """Drop the oldest conversation messages until within the token budget."""
+        while self._token_count > self._max_tokens and len(self._conversation) > 1:
+            self._conversation.popleft()
+            self._conversation_json.popleft()
+            content = self._conversation_dicts.popleft()["content"]
+            self._token_count -= _estimate_tokens(content)
+            if self._tool_results.get(content) == self._first_seq:
+                del self._tool_results[content]
+            self._first_seq += 1
 
     async def get_messages(self) -> list[Message]:
         """Get all messages."""
-        return list(self._messages)
+        return self._system + list(self._conversation)
 
     async def get_messages_for_request(
         self,
@@ -169,32 +364,82 @@ class SimpleContextManager(ContextManager):
         **kwargs: Any,
     ) -> list[Message]:
         """Get messages formatted for a chat request."""
-        messages = []
+        return self.get_messages_for_request_sync(system_prompt)
+
+    def get_messages_for_request_sync(
+        self,
+        system_prompt: str | None = None,
+    ) -> list[Message]:
+        """Synchronous get_messages_for_request() for in-shim callers."""
+        # Conversation history never holds system messages, so no filtering
+        system_entry = self._get_system_entry(system_prompt)
+        if system_entry is None:
+            return list(self._conversation)
+        return [system_entry[0], *self._conversation]
+
+    def get_history_dicts(self) -> list[dict[str, str]]:
+        """
+        Get all messages as bridge dicts.
 
-        # Add system prompt if provided
-        if system_prompt:
-            messages.append(Message(role=ROLE_SYSTEM, content=system_prompt))
-        elif self._system_prompt:
-            messages.append(Message(role=ROLE_SYSTEM, content=self._system_prompt))
+        Returns shallow copies of the cached dicts, so callers (including
+        JS via PyProxy) can't desync them from the cached request JSON.
+        """
+        system_dicts = [_message_to_dict(m) for m in self._system]
+        return [*system_dicts, *[dict(d) for d in self._conversation_dicts]]
+
+    def get_messages_json_for_request(
+        self,
+        system_prompt: str | None = None,
+    ) -> str:
+        """
+        Get get_messages_for_request() as a JSON array string of bridge dicts.
 
-        # Add conversation history (excluding any existing system messages in history)
-        for msg in self._messages:
-            if msg.role != ROLE_SYSTEM:
-                messages.append(msg)
+        Spliced together from the per-message JSON cached in add_message,
+        so only the system prompt is encoded per call.
+        """
+        history_json = ",".join(self._conversation_json)
 
-        return messages
+        system_entry = self._get_system_entry(system_prompt)
+        if system_entry is None:
+            return "[" + history_json + "]"
+        if not history_json:
+            return "[" + system_entry[1] + "]"
+        return "[" + system_entry[1] + "," + history_json + "]"
 
     async def set_messages(self, messages: list[Message]) -> None:
         """Replace all messages."""
-        self._messages = list(messages)
+        self._reset_history()
+        for message in messages:
+            self.add_message_sync(message)
 
     async def clear(self) -> None:
         """Clear all messages."""
-        self._messages = []
+        self._reset_history()
 
     def set_system_prompt(self, prompt: str) -> None:
         """Set the default system prompt."""
         self._system_prompt = prompt
+        self._system_entry = self._build_system_entry(prompt) if prompt else None
+
+        # The prompt is sent with every request, so it counts towards the budget
+        system_tokens = _estimate_tokens(prompt) if prompt else 0
+        self._token_count += system_tokens - self._system_tokens
+        self._system_tokens = system_tokens
+        self._trim()
+
+    def _get_system_entry(
+        self, system_prompt: str | None
+    ) -> tuple[Message, str] | None:
+        """Return the cached system entry unless a different prompt is given."""
+        if system_prompt and system_prompt != self._system_prompt:
+            return self._build_system_entry(system_prompt)
+        return self._system_entry
+
+    @staticmethod
+    def _build_system_entry(prompt: str) -> tuple[Message, str]:
+        """Build the system Message with its bridge JSON."""
+        message = Message(role=ROLE_SYSTEM, content=prompt)
+        return message, _json_dumps(_message_to_dict(message))
 
 
 # Note: SimpleOrchestrator and BrowserModuleLoader removed - not needed
@@ -232,14 +477,21 @@ Be concise, helpful, and friendly. If you don't know something, say so honestly.
         self.context = SimpleContextManager()
         self.hooks = HookRegistry()
 
+        # Prime the context's cached system message before the first execute
+        self.context.set_system_prompt(self.system_prompt)
+
         # Simple config dict (not using ModuleCoordinator)
         self.config = {
             "system_prompt": self.system_prompt,
             "model_id": model_id,
         }
 
-        # History list for JS interop (simple list of dicts)
-        self.history: list[dict[str, str]] = []
+        # ((prompt, stream, on_chunk), task) for the execute() currently
+        # running, used to fold duplicate submits into a single LLM call
+        self._inflight: (
+            tuple[tuple[str, bool, Callable[[str], None] | None], asyncio.Task[str]]
+            | None
+        ) = None
 
         self._initialized = False
         print(f"BrowserAmplifierSession created with model: {model_id}")
@@ -249,9 +501,6 @@ Be concise, helpful, and friendly. If you don't know something, say so honestly.
         if self._initialized:
             return
 
-        # Set system prompt on context
-        self.context.set_system_prompt(self.system_prompt)
-
         self._initialized = True
         print("BrowserAmplifierSession initialized")
 
@@ -264,55 +513,97 @@ Be concise, helpful, and friendly. If you don't know something, say so honestly.
         """
         Execute a prompt and return the response.
 
-        Uses amplifier-core types but simple direct orchestration.
+        Uses amplifier-core types but simple direct orchestration. A repeat
+        of the call still in flight (same prompt, stream and on_chunk)
+        shares that call's result instead of running a second turn.
 
         Args:
             prompt: User's input message
-            stream: Whether to stream (not yet implemented)
-            on_chunk: Callback for streaming chunks
+            stream: Whether to stream the response from the provider
+            on_chunk: Callback for streaming chunks (called per text batch)
 
         Returns:
-            The assistant's response text
+            The assistant's response text (empty for a blank prompt)
         """
+        # Nothing to send - skip the pipeline and the model call entirely
+        if not prompt or prompt.isspace():
+            return ""
+
+        # A repeat of the call already running (e.g. a double click) waits
+        # for that result instead of starting another turn. stream and
+        # on_chunk are part of the key, so a caller expecting its own
+        # chunks is never folded into another call's stream.
+        key = (prompt, stream, on_chunk)
+        if self._inflight is not None and self._inflight[0] == key:
+            return await asyncio.shield(self._inflight[1])
+
+        task = asyncio.ensure_future(self._execute(prompt, stream, on_chunk))
+        self._inflight = (key, task)
+        try:
+            return await task
+        finally:
+            if self._inflight is not None and self._inflight[1] is task:
+                self._inflight = None
+
+    async def _execute(
+        self,
+        prompt: str,
+        stream: bool,
+        on_chunk: Callable[[str], None] | None,
+    ) -> str:
+        """Run one full turn for execute()."""
         if not self._initialized:
             await self.initialize()
 
         # Add user message to context
         user_message = Message(role=ROLE_USER, content=prompt)
-        await self.context.add_message(user_message)
+        self.context.add_message_sync(user_message)
 
         # Emit hook event
         await self.hooks.emit(events.PROVIDER_REQUEST, {"message": prompt})
 
         try:
             # Get messages for request
-            messages = await self.context.get_messages_for_request(
+            messages = self.context.get_messages_for_request_sync(
+                system_prompt=self.system_prompt
+            )
+
+            messages_json = self.context.get_messages_json_for_request(
                 system_prompt=self.system_prompt
             )
 
             # Create chat request using amplifier-core types
             request = ChatRequest(messages=messages)
 
-            # Get completion from provider
-            response = await self.provider.complete(request)
-
-            # Extract text from response blocks
-            response_text = ""
-            if response.content:
-                for block in response.content:
-                    if hasattr(block, "text"):
-                        response_text += block.text
-                    elif isinstance(block, str):
-                        response_text += block
+            # Get completion from provider (reusing the cached bridge JSON)
+            if stream:
+                response_text = ""
+                usage = None
+                async for response in self.provider.stream(
+                    request, messages_json=messages_json
+                ):
+                    chunk = _response_text(response)
+                    if chunk:
+                        response_text += chunk
+                        if on_chunk:
+                            on_chunk(chunk)
+                    if response.usage is not None:
+                        usage = response.usage
+            else:
+                response = await self.provider.complete(
+                    request, messages_json=messages_json
+                )
+                response_text = _response_text(response)
+                usage = response.usage
 
             # Add assistant response to context
             assistant_message = Message(role=ROLE_ASSISTANT, content=response_text)
-            await self.context.add_message(assistant_message)
+            self.context.add_message_sync(assistant_message)
 
             # Emit hook event
             await self.hooks.emit(
                 events.PROVIDER_RESPONSE,
-                {"response": response_text, "usage": response.usage},
+                {"response": response_text, "usage": usage},
             )
 
             return response_text
@@ -321,14 +612,13 @@ Be concise, helpful, and friendly. If you don't know something, say so honestly.
             await self.hooks.emit(events.PROVIDER_ERROR, {"error": str(e)})
             raise
 
-    async def get_history(self) -> list[dict[str, Any]]:
+    async def get_history(self) -> list[dict[str, str]]:
         """Get conversation history as dicts for JS interop."""
-        messages = await self.context.get_messages()
-        return [{"role": msg.role, "content": msg.content} for msg in messages]
+        return self.context.get_history_dicts()
 
     async def clear_history(self) -> None:
         """Clear conversation history."""
-        self.context._messages = []
+        await self.context.clear()
         print("Conversation history cleared")
 
     def set_system_prompt(self, prompt: str) -> None: